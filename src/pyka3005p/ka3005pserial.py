@@ -1,10 +1,152 @@
 import serial
-import atexit
-
-from time import sleep
+import logging
+import os
+import queue
+import threading
+import weakref
+
+from concurrent.futures import Future
+from time import sleep, monotonic
 from labdevices import powersupply
 
+_log = logging.getLogger(__name__)
+
+_CMD_IDN_Q = b"*IDN?"
+_CMD_STATUS_Q = b"STATUS?"
+_CMD_OUT0 = b"OUT0"
+_CMD_OUT1 = b"OUT1"
+_CMD_OCP0 = b"OCP0"
+_CMD_OCP1 = b"OCP1"
+_CMD_OVP0 = b"OVP0"
+_CMD_OVP1 = b"OVP1"
+
+_IDN_PREFIX = "KORAD KA3005P"
+_IDN_LEN = 30
+
+# Upper bound for replies of unknown length (IDN is 30 bytes)
+_MAX_REPLY_LEN = 64
+
+def _parseFixedPoint(repl, dotPos):
+	# Parses fixed width replies like XX.XX or X.XXX into an integer
+	# counting units of the last digit
+	if (len(repl) != 5) or (repl[dotPos] != '.'):
+		raise ValueError("Unknown fixed point response {}".format(repl))
+	digits = repl[:dotPos] + repl[dotPos+1:]
+	if not digits.isdigit():
+		raise ValueError("Unknown fixed point response {}".format(repl))
+	return int(digits)
+
+def _ioLoop(cmdQueue):
+	# Runs on the I/O worker thread, only references the queue so the
+	# power supply object itself can still be garbage collected
+	while True:
+		item = cmdQueue.get()
+		if item is None:
+			break
+		_ioExecute(*item)
+		# Do not keep the last bound method alive while waiting
+		item = None
+
+	# Nothing queued after the stop marker will ever run, fail it instead of
+	# leaving callers waiting on the result forever
+	while True:
+		try:
+			item = cmdQueue.get_nowait()
+		except queue.Empty:
+			break
+		if (not (item is None)) and item[2].set_running_or_notify_cancel():
+			item[2].set_exception(IOError("Port is not open"))
+
+def _ioExecute(func, args, fut):
+	if not fut.set_running_or_notify_cancel():
+		return
+	try:
+		fut.set_result(func(*args))
+	except Exception as e:
+		fut.set_exception(e)
+
+class _SharedPort:
+	# Serial port opened by name, shared by all instances using the same device
+	def __init__(self, port):
+		self.port = port
+		self.refCount = 0
+		self.lock = threading.Lock()
+		# Gap and status cache belong to the device, not to a single instance
+		self.lastWriteTs = 0.0
+		# ( status byte, timestamp ) or None, replaced as a whole so readers
+		# never observe a half updated cache
+		self.statusCache = None
+		self.closed = False
+		# Set once the instance that opened the port finished (or failed) the
+		# device initialization, instances joining later wait for it
+		self.initDone = threading.Event()
+		self.initFailed = False
+
+def _releasePort(portKey, switchOff = None):
+	# Closes a shared port once the last instance using it releases it. The
+	# output is only switched off by the last instance, with the registry lock
+	# held so no other instance can join or leave in between
+	with KA3005PSerial._portRegistryLock:
+		entry = KA3005PSerial._portRegistry[portKey]
+		try:
+			if (entry.refCount == 1) and (not (switchOff is None)):
+				switchOff(entry)
+		finally:
+			entry.refCount = entry.refCount - 1
+			if entry.refCount <= 0:
+				del KA3005PSerial._portRegistry[portKey]
+				entry.closed = True
+				entry.port.close()
+
+def _closePort(portKey, commandDelay):
+	# Used as finalizer, must not reference the power supply object itself
+	_releasePort(portKey, lambda entry: _writeOff(entry, commandDelay))
+
+def _writeOff(entry, commandDelay):
+	# Another instance may still be in a transaction at exit, switch off only
+	# between transactions and after the inter-command gap
+	if entry.lock.acquire(timeout = 5.0):
+		try:
+			dt = commandDelay - (monotonic() - entry.lastWriteTs)
+			if dt > 0:
+				sleep(dt)
+			entry.statusCache = None
+			# No flush, tcdrain is not bounded by write_timeout and could block exit
+			entry.port.write(_CMD_OUT0)
+		except Exception:
+			pass
+		finally:
+			entry.lastWriteTs = monotonic()
+			entry.lock.release()
+
+def _enableLowLatency(port):
+	# Reduces the FTDI latency timer on Linux, not supported on all platforms and adapters
+	try:
+		port.set_low_latency_mode(True)
+	except (AttributeError, NotImplementedError, OSError, ValueError):
+		pass
+
+def _encodeCommand(cmd):
+	if isinstance(cmd, (bytes, bytearray)):
+		return cmd
+	return cmd.encode('ascii')
+
+class _LogData:
+	# Renders protocol data for log records, only when a record is emitted
+	def __init__(self, data, binary = False):
+		self.data = data
+		self.binary = binary
+
+	def __str__(self):
+		if self.binary:
+			return bytes(self.data).hex()
+		return bytes(self.data).decode('ascii', errors = 'backslashreplace')
+
 class KA3005PSerial(powersupply.PowerSupply):
+	# Ports opened by name are shared between instances: realpath -> _SharedPort
+	_portRegistry = {}
+	_portRegistryLock = threading.Lock()
+
 	def __init__(
 		self,
 		port,
@@ -26,28 +168,54 @@ class KA3005PSerial(powersupply.PowerSupply):
 			capableOnOff = True
 		)
 
-		self._debug = debug
 		self._timeoutRetry = timeoutRetry
 		self._readbackRetry = readbackRetry
+		# Minimum gap between two commands, not a fixed delay per command. Commands
+		# issued after a longer pause (e.g. polling loops) are sent immediately,
+		# polling heavy workloads may lower this to about 0.02
 		self._serialCommandDelay = serialCommandDelay
+		self._finalizer = None
+		self._portKey = None
+		self._shared = None
+
+		# The KA3005P only has a single channel, command prefixes are fixed
+		self._vsetPrefix = b"VSET1:"
+		self._vsetQuery = b"VSET1?"
+		self._isetPrefix = b"ISET1:"
+		self._isetQuery = b"ISET1?"
+		self._voutQuery = b"VOUT1?"
+		self._ioutQuery = b"IOUT1?"
+
+		# All port I/O is executed in order on a single worker thread. It runs
+		# while a port opened by name is open, or for a port passed in by the
+		# caller (which is never closed by us) until disconnect or leaving with
+		self._cmdQueue = None
+		self._worker = None
+		self._workerFinalizer = None
+		# Guards queueing against stopping the worker from another thread
+		self._workerLock = threading.Lock()
 
 		if isinstance(port, serial.Serial):
+			_enableLowLatency(port)
 			self._port = port
 			self._portName = None
-			self.__initialRequests()
+			self._shared = _SharedPort(port)
+			self._startWorker()
+			try:
+				self.__initialRequests()
+			except BaseException:
+				# The base class keeps the instance alive, so would the worker be
+				self._stopWorker()
+				raise
 		else:
 			self._portName = port
 			self._port = None
 
-		atexit.register(self.__close)
-
 	def __initialRequests(self):
 		# Query the identity and do a check this is a KA3005P
 		self._idn(initialQuery = True)
 		# Disable output, disable overcurrent and overvoltage protection
-		self._sendCommand("OUT0")
-		self._sendCommand("OCP0")
-		self._sendCommand("OVP0")
+		self._sendCommandBatch([ _CMD_OUT0, _CMD_OCP0, _CMD_OVP0 ])
 		self._setVoltage(0, 1)
 		self._setCurrent(0, 1)
 
@@ -59,8 +227,10 @@ class KA3005PSerial(powersupply.PowerSupply):
 
 		# Open the serial port / pipe in case we should open it ourself
 		if (self._port is None) and (not (self._portName is None)):
-			self._port = serial.Serial(self._portName, baudrate=19200, bytesize=serial.EIGHTBITS, parity=serial.PARITY_NONE, stopbits=serial.STOPBITS_ONE, timeout=1)
-			self.__initialRequests()
+			self._openPort()
+		elif self._portName is None:
+			# A port passed in by the caller only needs the worker again
+			self._startWorker()
 
 		self._usesContext = True
 
@@ -73,18 +243,122 @@ class KA3005PSerial(powersupply.PowerSupply):
 		self._usesContext = False
 
 	def __close(self):
-		atexit.unregister(self.__close)
-		if (not (self._port is None)) and (not (self._portName is None)):
-			self._off()
-			self._port.close()
+		if self._portName is None:
+			# The port was passed in by the caller and stays open, only stop the worker
+			self._stopWorker()
+		elif not (self._port is None):
+			try:
+				# Only the last instance using a shared port switches the output off.
+				# Release even if the device stopped answering, detach only succeeds
+				# once so the finalizer cannot release a second time
+				if self._finalizer.detach():
+					_releasePort(self._portKey, lambda entry: self._off())
+			finally:
+				self._stopWorker()
+				self._finalizer = None
+				self._port = None
+				self._shared = None
+
+	def _startWorker(self):
+		if not (self._worker is None):
+			return
+		cmdQueue = queue.Queue()
+		worker = threading.Thread(target = _ioLoop, args = (cmdQueue,), daemon = True)
+		worker.start()
+		with self._workerLock:
+			self._cmdQueue = cmdQueue
+			self._worker = worker
+		# Stops the worker if the instance is ever collected. The base class keeps
+		# every instance registered with atexit, so in practice this could only
+		# fire at interpreter exit, before the base class switches the output off
+		# through this very worker. It must therefore not run at exit
+		self._workerFinalizer = weakref.finalize(self, self._cmdQueue.put, None)
+		self._workerFinalizer.atexit = False
+
+	def _stopWorker(self):
+		# Marked as stopped before the stop marker is queued, so no command can
+		# be queued behind it. Commands queued before still run
+		with self._workerLock:
+			worker = self._worker
+			cmdQueue = self._cmdQueue
+			if worker is None:
+				return
+			self._worker = None
+			self._cmdQueue = None
+			cmdQueue.put(None)
+		self._workerFinalizer.detach()
+		if not (worker is threading.current_thread()):
+			worker.join()
+
+	def _openPort(self):
+		self._portKey = os.path.realpath(self._portName)
+		# Only the instance that opens the port initializes the device, later
+		# instances share its state (output, setpoints and protection)
+		firstUser = False
+		with KA3005PSerial._portRegistryLock:
+			entry = KA3005PSerial._portRegistry.get(self._portKey)
+			if not (entry is None):
+				entry.refCount = entry.refCount + 1
+
+		if entry is None:
+			# Opening the tty is slow, the registry lock is not held meanwhile
+			port = serial.Serial(self._portName, baudrate=19200, bytesize=serial.EIGHTBITS, parity=serial.PARITY_NONE, stopbits=serial.STOPBITS_ONE, timeout=1, write_timeout=1.0)
+			_enableLowLatency(port)
+			with KA3005PSerial._portRegistryLock:
+				entry = KA3005PSerial._portRegistry.get(self._portKey)
+				if entry is None:
+					entry = _SharedPort(port)
+					KA3005PSerial._portRegistry[self._portKey] = entry
+					port = None
+					firstUser = True
+				entry.refCount = entry.refCount + 1
+			if not (port is None):
+				# Another instance opened the same device in the meantime
+				port.close()
+
+		self._port = entry.port
+		self._shared = entry
+		self._finalizer = None
+		try:
+			self._startWorker()
+			# Switches off and releases the port at interpreter exit if it is still open.
+			# Instances are kept alive by the base class atexit registration, so this
+			# does not run earlier
+			self._finalizer = weakref.finalize(self, _closePort, self._portKey, self._serialCommandDelay)
+			if firstUser:
+				try:
+					self.__initialRequests()
+				except BaseException:
+					entry.initFailed = True
+					raise
+				finally:
+					entry.initDone.set()
+			else:
+				# The device state is only known to be reset once the first
+				# instance finished its initialization
+				if not entry.initDone.wait(timeout = 30.0):
+					raise IOError("Timeout waiting for initialization of shared port {}".format(self._portName))
+				if entry.initFailed:
+					raise IOError("Initialization of shared port {} failed".format(self._portName))
+				self._idn(initialQuery = True)
+		except BaseException:
+			# Do not leave a stale reference on the shared port behind, __exit__
+			# does not run when opening fails
+			self._stopWorker()
+			if (self._finalizer is None) or self._finalizer.detach():
+				_releasePort(self._portKey)
+			self._finalizer = None
 			self._port = None
+			self._shared = None
+			raise
 
 	# Connect / Disconnect
 
 	def _connect(self):
 		if (self._port is None) and (not (self._portName is None)):
-			self._port = serial.Serial(self._portName, baudrate=19200, bytesize=serial.EIGHTBITS, parity=serial.PARITY_NONE, stopbits=serial.STOPBITS_ONE, timeout=1)
-			self.__initialRequests()
+			self._openPort()
+		elif self._portName is None:
+			self._startWorker()
 
 		return True
 
@@ -96,72 +370,136 @@ class KA3005PSerial(powersupply.PowerSupply):
 
 	# Utility functions
 
+	def _waitCommandGap(self):
+		# Only wait for the remainder of the minimum inter-command gap
+		dt = self._serialCommandDelay - (monotonic() - self._shared.lastWriteTs)
+		if dt > 0:
+			sleep(dt)
+
+	def _writeCommand(self, data):
+		# Any command may change the device state
+		self._shared.statusCache = None
+
+		self._waitCommandGap()
+		try:
+			# Bounded by write_timeout. No flush() since tcdrain is not bounded
+			# by any timeout and would block forever on a wedged adapter
+			self._port.write(data)
+		except serial.SerialTimeoutException:
+			# Part of the command may already have been sent, resending it could
+			# deliver a fragment followed by the full command to the device
+			raise IOError("Serial port write timeout")
+		finally:
+			self._shared.lastWriteTs = monotonic()
+
+	def _submit(self, func, *args):
+		# Queueing without a running worker would wait forever for the result
+		fut = Future()
+		with self._workerLock:
+			if (self._worker is None) or (not self._worker.is_alive()):
+				raise IOError("Port is not open")
+			self._cmdQueue.put((self._runLocked, (func, args), fut))
+		return fut
+
+	def _runLocked(self, func, args):
+		# The port may be shared with other instances, keep transactions atomic
+		with self._shared.lock:
+			return func(*args)
+
 	def _sendCommand(self, cmd):
-		if self._debug:
-			print("PSU> {}".format(cmd))
-		sleep(self._serialCommandDelay)
-		self._port.write(cmd.encode('ascii'))
+		return self._submit(self._doSendCommand, cmd).result()
+
+	def _sendCommandBatch(self, cmds):
+		return self._submit(self._doSendCommandBatch, cmds).result()
 
 	def _sendCommandReply(self, cmd, replyLen = None, binary = False):
-		retries = self._timeoutRetry
+		return self._sendCommandReplyAsync(cmd, replyLen, binary).result()
 
-		if self._debug:
-			print("PSU> {}".format(cmd))
-		sleep(self._serialCommandDelay)
-		self._port.write(cmd.encode('ascii'))
+	def _sendCommandReplyAsync(self, cmd, replyLen = None, binary = False):
+		# Returns a Future so callers can overlap serial latency with their own work
+		return self._submit(self._doSendCommandReply, cmd, replyLen, binary)
 
-		res = []
-		while True:
-			if not binary:
-				c = self._port.read(1).decode('ascii')
-			else:
-				c = self._port.read(1)
+	def _sendSetAndQuery(self, setCmd, queryCmd, replyLen):
+		return self._submit(self._doSendSetAndQuery, setCmd, queryCmd, replyLen).result()
+
+	def _doSendCommand(self, cmd):
+		cmd = _encodeCommand(cmd)
+		_log.debug("PSU> %s", _LogData(cmd))
+		self._writeCommand(cmd)
+
+	def _doSendCommandBatch(self, cmds):
+		# Only for write-only commands that do not require a reply
+		cmd = b"".join([ _encodeCommand(c) for c in cmds ])
+		_log.debug("PSU> %s", _LogData(cmd))
+		self._writeCommand(cmd)
+
+	def _doSendCommandReply(self, cmd, replyLen = None, binary = False):
+		cmd = _encodeCommand(cmd)
+		_log.debug("PSU> %s", _LogData(cmd))
+		self._writeCommand(cmd)
+
+		return self._readReply(replyLen, binary)
+
+	def _doSendSetAndQuery(self, setCmd, queryCmd, replyLen):
+		# Set and readback query are written back to back in a single transfer
+		cmd = _encodeCommand(setCmd) + _encodeCommand(queryCmd)
+		_log.debug("PSU> %s", _LogData(cmd))
+		self._writeCommand(cmd)
+
+		return self._readReply(replyLen)
+
+	def _doReadStatusByte(self):
+		# The status register is a single raw byte, indexing yields the integer
+		repl = self._doSendCommandReply(_CMD_STATUS_Q, replyLen = 1, binary = True)
+		if len(repl) != 1:
+			raise IOError("Unknown status response {}".format(repl))
+
+		# Updated while holding the port lock so no other write can slip in between
+		self._shared.statusCache = ( repl[0], monotonic() )
+		return repl[0]
 
-			if len(c) <= 0:
-				if replyLen < 0:
-					break
+	def _readReply(self, replyLen = None, binary = False):
+		retries = self._timeoutRetry
 
-				if self._debug:
-					print("PSU Timeout, received {} until now".format(res))
+		if (not (replyLen is None)) and (replyLen > 0):
+			buf = bytearray(self._port.read(replyLen))
+			while len(buf) < replyLen:
+				_log.debug("PSU Timeout, received %s until now", _LogData(buf, binary))
 				if (not (retries is None)):
 					if retries > 0:
 						retries = retries - 1
-						continue
 					else:
 						raise IOError("Serial port timeout")
-			if ord(c) == 0:
-				break
-
-			res.append(c)
-			if not (replyLen is None):
-				if len(res) == replyLen:
-					break
+				buf += self._port.read(replyLen - len(buf))
+			if (not binary) and (self._port.in_waiting > 0):
+				# Drop an optional trailing NUL terminator without waiting for it
+				buf += self._port.read(self._port.in_waiting)
+		else:
+			buf = bytearray(self._port.read_until(b'\x00', _MAX_REPLY_LEN))
 
 		if not binary:
-			reply = "".join(res)
+			reply = buf.rstrip(b'\x00').decode('ascii')
+			_log.debug("PSU< %s", reply)
 		else:
-			reply = res
-
-		if self._debug:
-			print("PSU< {}".format(reply))
+			reply = bytes(buf)
+			_log.debug("PSU< %s", _LogData(reply, True))
 
 		return reply
 
 	# Communication functions
 
 	def _idn(self, initialQuery = False):
-		repl = self._sendCommandReply("*IDN?", replyLen = -1)
+		# Fixed length read, the device does not reliably terminate the reply so
+		# a terminated read would only end on timeout
+		repl = self._sendCommandReply(_CMD_IDN_Q, replyLen = _IDN_LEN)
 
-		if len(repl) != 30:
-			raise IOError("Unknown IDN response {}, not a KORAD KA3005P?".format(repl))
-		if repl[:len("KORAD KA3005P")] != "KORAD KA3005P":
+		if (len(repl) != _IDN_LEN) or (not repl.startswith(_IDN_PREFIX)):
 			raise IOError("Unknown IDN response {}, not a KORAD KA3005P?".format(repl))
 
-		sn = repl[22:]
+		sn = repl[22:30]
 		ver = repl[15:18]
 
-		if self._debug:
-			print("PSU: Serial {}, version {}".format(sn, ver))
+		_log.debug("PSU: Serial %s, version %s", sn, ver)
 
 		if initialQuery:
 			self._serialNumber = sn
@@ -174,93 +512,114 @@ class KA3005PSerial(powersupply.PowerSupply):
 		}
 
 
+	def _readStatusByte(self, maxAgeSec = 0.05):
+		shared = self._shared
+		if not (shared is None):
+			# Another instance's worker may invalidate the cache concurrently, read it once
+			cached = shared.statusCache
+			if (not (cached is None)) and ((monotonic() - cached[1]) < maxAgeSec):
+				return cached[0]
+
+		return self._submit(self._doReadStatusByte).result()
+
 	def _setChannelEnable(self, enable, channel):
 		retries = self._readbackRetry
 
 		while True:
 			if enable:
-				self._sendCommand("OUT1")
+				self._sendCommand(_CMD_OUT1)
 			else:
-				self._sendCommand("OUT0")
+				self._sendCommand(_CMD_OUT0)
 
 			# Read back status ...
-			repl = self._sendCommandReply("STATUS?", replyLen = 1, binary = True)
-			if len(repl) == 1:
-				repl = int.from_bytes(repl[0], "little")
-				if ((repl & 0x40 == 0) and not enable) or ((repl & 0x40 != 0) and enable):
-					return True
+			repl = self._readStatusByte(maxAgeSec = 0)
+			if ((repl & 0x40 == 0) and not enable) or ((repl & 0x40 != 0) and enable):
+				return True
 
-			print("PSU Readback failed")
+			_log.warning("PSU readback failed")
 
-			if retries > 0:
-				retries = retries - 1
-				if retries == 0:
-					raise IOError("Failed to set output status and read back correct state")
-				retries = retries - 1
+			retries = retries - 1
+			if retries <= 0:
+				raise IOError("Failed to set output status and read back correct state")
 
 
 	def _setVoltage(self, voltage, channel):
 		retries = self._readbackRetry
 
-		while True:
-			self._sendCommand("VSET{0}:{1:05.2f}".format(channel, voltage))
+		if (voltage < self._vrange[0]) or (voltage > self._vrange[1]):
+			raise ValueError("Voltage {} out of range {} to {}".format(voltage, self._vrange[0], self._vrange[1]))
+
+		vStr = f"{voltage:05.2f}"
+		setVoltage = int(vStr.replace('.', ''))
 
-			# Readback status
-			repl = self._sendCommandReply("VSET{0}?".format(channel), replyLen = 5)
+		while True:
+			# Set and read back status
 			try:
-				readVoltage = float(repl)
+				repl = self._sendSetAndQuery(self._vsetPrefix + vStr.encode('ascii'), self._vsetQuery, replyLen = 5)
+				readVoltage = _parseFixedPoint(repl, 2)
 			except ValueError:
-				if self._debug:
-					print("PSU Failed to parse response on VSET? after setting")
+				_log.debug("PSU Failed to parse response on VSET? after setting")
 				readVoltage = None
 
-			if abs(readVoltage - voltage) < 1e-2:
+			if readVoltage is None:
+				retries = retries - 1
+				if retries <= 0:
+					raise IOError("Failed to parse read back set voltage")
+				continue
+
+			if readVoltage == setVoltage:
 				return True
 
-			print("PSU Mismatch of set and read back voltage (set {}, read {})".format(voltage, readVoltage))
+			_log.warning("PSU Mismatch of set and read back voltage (set %s, read %s)", vStr, repl)
 
-			if retries > 0:
-				retries = retries - 1
-				if retries == 0:
-					raise IOError("Failed to read back set voltage")
+			retries = retries - 1
+			if retries <= 0:
+				raise IOError("Failed to read back set voltage")
 
 	def _setCurrent(self, current, channel):
 		retries = self._readbackRetry
 
-		while True:
-			self._sendCommand("ISET{0}:{1:05.3f}".format(channel, current))
+		if (current < self._arange[0]) or (current > self._arange[1]):
+			raise ValueError("Current {} out of range {} to {}".format(current, self._arange[0], self._arange[1]))
 
-			# Read back status
-			repl = self._sendCommandReply("ISET{0}?".format(channel), replyLen = 5)
+		aStr = f"{current:05.3f}"
+		setCurrent = int(aStr.replace('.', ''))
 
+		while True:
+			# Set and read back status
 			try:
-				readCurrent = float(repl[:5])
+				repl = self._sendSetAndQuery(self._isetPrefix + aStr.encode('ascii'), self._isetQuery, replyLen = 5)
+				readCurrent = _parseFixedPoint(repl, 1)
 			except ValueError:
-				if self._debug:
-					print("PSU Failed to parse response on ISET? after setting")
+				_log.debug("PSU Failed to parse response on ISET? after setting")
 				readCurrent = None
 
-			if abs(readCurrent - current) < 1e-2:
+			if readCurrent is None:
+				retries = retries - 1
+				if retries <= 0:
+					raise IOError("Failed to parse read back set current")
+				continue
+
+			if readCurrent == setCurrent:
 				return True
 
-			print("PSU Mismatch of set and read back current (set {}, read {})".format(current, readCurrent))
+			_log.warning("PSU Mismatch of set and read back current (set %s, read %s)", aStr, repl)
 
-			if retries > 0:
-				retries = retries - 1
-				if retries == 0:
-					raise IOError("Failed to read back set current")
+			retries = retries - 1
+			if retries <= 0:
+				raise IOError("Failed to read back set current")
 
 	def _getVoltage(self, channel):
-		vRead = self._sendCommandReply("VOUT{0}?".format(channel), replyLen = 5)
+		vRead = self._sendCommandReply(self._voutQuery, replyLen = 5)
 		try:
-			return float(vRead)
+			return _parseFixedPoint(vRead, 2) / 100
 		except ValueError:
 			raise IOError("Unknown voltage response {}".format(vRead))
 
 	def _getCurrent(self, channel):
-		vRead = self._sendCommandReply("IOUT{0}?".format(channel), replyLen = 5)
+		vRead = self._sendCommandReply(self._ioutQuery, replyLen = 5)
 		try:
-			return float(vRead)
+			return _parseFixedPoint(vRead, 1) / 1000
 		except ValueError:
 			raise IOError("Unknown voltage response {}".format(vRead))
 
@@ -269,10 +628,7 @@ class KA3005PSerial(powersupply.PowerSupply):
 		return True
 
 	def _getLimitMode(self, channel):
-		repl = self._sendCommandReply("STATUS?", replyLen = 1, binary = True)
-		if len(repl) != 1:
-			raise IOError("Unknown status response {}".format(repl))
-		repl = int.from_bytes(repl[0], "little")
+		repl = self._readStatusByte()
 		if (repl & 0x40) == 0:
 			return powersupply.PowerSupplyLimit.NONE
 		if (repl & 0x01) == 0:
@@ -281,7 +637,9 @@ class KA3005PSerial(powersupply.PowerSupply):
 			return powersupply.PowerSupplyLimit.VOLTAGE
 
 	def _isConnected(self):
-		if not (self._port is None):
+		# The port may already have been closed by the finalizer at interpreter exit,
+		# a port passed in by the caller is only usable while the worker runs
+		if (not (self._port is None)) and (not self._shared.closed) and (not (self._worker is None)):
 			return True
 		else:
 			return False
@@ -291,47 +649,37 @@ class KA3005PSerial(powersupply.PowerSupply):
 
 		while True:
 			if enabled:
-				self._sendCommand("OCP1")
+				self._sendCommand(_CMD_OCP1)
 			else:
-				self._sendCommand("OCP0")
+				self._sendCommand(_CMD_OCP0)
 
 			# Read back status
-			repl = self._sendCommandReply("STATUS?", replyLen = 1, binary = True)
-			if len(repl) != 1:
-				raise IOError("Unknown status response {}".format(repl))
-			repl = int.from_bytes(repl[0], "little")
+			repl = self._readStatusByte(maxAgeSec = 0)
 
 			if (enabled and ((repl & 0x10) == 0)) or ((not enabled) and ((repl & 0x10) != 0)):
 				return True
 
-			if retries > 0:
-				retries = retries - 1
-				if retries == 0:
-					raise IOError("Failed to set overcurrent protection to {} and read back correct state (returned {})".format(enabled, repl))
-				retries = retries - 1
+			retries = retries - 1
+			if retries <= 0:
+				raise IOError("Failed to set overcurrent protection to {} and read back correct state (returned {})".format(enabled, repl))
 
 	def _protectionOverVoltageEnable(self, enabled, channel = 1):
 		retries = self._readbackRetry
 
 		while True:
 			if enabled:
-				self._sendCommand("OVP1")
+				self._sendCommand(_CMD_OVP1)
 			else:
-				self._sendCommand("OVP0")
+				self._sendCommand(_CMD_OVP0)
 
 			sleep(1)
 
 			# Read back status
-			repl = self._sendCommandReply("STATUS?", replyLen = 1, binary = True)
-			if len(repl) != 1:
-				raise IOError("Unknown status response {}".format(repl))
-			repl = int.from_bytes(repl[0], "little")
+			repl = self._readStatusByte(maxAgeSec = 0)
 
 			if (enabled and ((repl & 0x80) != 0)) or ((not enabled) and ((repl & 0x80) == 0)):
 				return True
 
-			if retries > 0:
-				retries = retries - 1
-				if retries == 0:
-					raise IOError("Failed to set overvoltage protection to {} and read back correct state".format(enabled))
-				retries = retries - 1
+			retries = retries - 1
+			if retries <= 0:
+				raise IOError("Failed to set overvoltage protection to {} and read back correct state".format(enabled))